@@ -37,23 +37,74 @@ Purpose:
 Please ensure you have reviewed and understood the license and disclaimer before using this script.
 """
 
+import io
 import os
+import shutil
+import functools
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import datetime
 import csv
+import json
 import time
 from urllib.parse import urljoin, urlparse
-from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate, parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+from collections import deque, namedtuple
 from bs4 import BeautifulSoup
+try:
+    import lxml.etree  # C-backed parser - streams the Apache listings; its presence also enables BeautifulSoup's "lxml" builder
+    HTML_PARSER = "lxml"
+except ImportError:
+    lxml = None
+    HTML_PARSER = "html.parser"
+    print("[WARNING] lxml is not installed, falling back to the slower html.parser (pip install lxml)")
 import re  # Import the regular expression module
+import html
 
 # Configuration
 BASE_URL = "https://www.misp-project.org/feeds/"
 OUTPUT_DIR = "AirgapIntel_Feeds"
 LOG_FILE = os.path.join(OUTPUT_DIR, "misp_feed_download_log.csv")
+ETAGS_FILE = os.path.join(OUTPUT_DIR, ".etags.json")  # ETags of the files on disk, for servers that send no Last-Modified
 DAYS_BACK_DEFAULT = 7  # Default days back to retrieve files
+MAX_FEED_WORKERS = 32  # Feeds processed concurrently - network-bound, so well above the CPU count; kept bounded as each feed can run MAX_FILE_WORKERS downloads of its own
+MAX_FILE_WORKERS = 8  # Concurrent file downloads within a single feed
+MAX_CONNECTIONS_PER_HOST = 8  # Cap on simultaneous file downloads from one host (across all feeds)
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # Read/write block for streamed downloads (multi-MB feeds in a handful of syscalls)
+CONNECT_TIMEOUT = 5  # Seconds to establish a connection - unreachable hosts fail fast; read timeouts stay per request
 
 successful_feed_count = 0  # Initialize a global counter for successful feeds
+_successful_feed_count_lock = threading.Lock()  # Feeds complete on worker threads
+
+# Shared HTTP session - keeps connections alive and pooled per host so repeated
+# downloads from the same server (CIRCL, abuse.ch, ...) skip the TCP/TLS handshake.
+# Its default Accept-Encoding asks for gzip/deflate (plus br when the brotli package is
+# installed), so listings and text feeds are transferred compressed and decoded on read.
+SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+)
+SESSION.mount("http://", _ADAPTER)
+SESSION.mount("https://", _ADAPTER)
+
+_host_semaphores = {}  # netloc -> BoundedSemaphore, created on first use
+_host_semaphores_lock = threading.Lock()
+
+# ETag of each downloaded file (output path -> ETag), loaded from and saved to ETAGS_FILE by main()
+_etags = {}
+_etags_lock = threading.Lock()
+
+# Direct downloads already fetched this run (url -> output path), so feeds sharing a URL
+# (e.g. the TweetFeed entries) download it once; each URL gets its own lock. Used only by
+# download_shared_feed_file and reset by main() at the start of each run
+_downloaded_files = {}
+_url_locks = {}
+_url_locks_lock = threading.Lock()
 
 def ascii_art():
     """Prints ASCII art for MISP Airgap Feeds."""
@@ -69,20 +120,111 @@ def ascii_art():
                                                                                                      
     """)
 
-def download_feed_file(feed_url, output_folder, feed_name):
+def conditional_request_headers(headers, output_path):
+    """Returns a copy of headers with If-Modified-Since (and If-None-Match) set when output_path was already downloaded.
+
+    The file's mtime is the server's Last-Modified (see set_mtime_from_last_modified), so
+    an unchanged file is answered with an empty 304 instead of being sent again. Servers that
+    send no Last-Modified (e.g. raw.githubusercontent.com) are matched on the stored ETag instead.
+    """
+    if not os.path.isfile(output_path):
+        return headers
+    headers = dict(headers or {})
+    headers["If-Modified-Since"] = formatdate(os.path.getmtime(output_path), usegmt=True)
+    with _etags_lock:
+        etag = _etags.get(output_path)
+    if etag:
+        headers["If-None-Match"] = etag
+    return headers
+
+def record_etag(output_path, response):
+    """Remembers the response's ETag for output_path, or forgets a stale one when the server sent none."""
+    etag = response.headers.get("ETag")
+    with _etags_lock:
+        if etag:
+            _etags[output_path] = etag
+        else:
+            _etags.pop(output_path, None)
+
+def load_etags(etags_file):
+    """Loads the ETags saved by the previous run into _etags."""
+    try:
+        with open(etags_file, encoding="utf-8") as f:
+            etags = json.load(f)
+    except (OSError, ValueError):  # First run, or an unreadable file - download unconditionally
+        etags = {}
+    with _etags_lock:
+        _etags.clear()
+        _etags.update(etags)
+
+def save_etags(etags_file):
+    """Saves _etags for the next run's conditional requests."""
+    with _etags_lock:
+        etags = dict(_etags)
+    part_path = etags_file + ".part"
+    with open(part_path, "w", encoding="utf-8") as f:
+        json.dump(etags, f, indent=1, sort_keys=True)
+    os.replace(part_path, etags_file)
+
+def set_mtime_from_last_modified(output_path, response):
+    """Stamps a downloaded file with the response's Last-Modified time, when the server sent one."""
+    last_modified = response.headers.get("Last-Modified")
+    if not last_modified:
+        return
+    try:
+        timestamp = parsedate_to_datetime(last_modified).timestamp()
+    except (TypeError, ValueError):  # Malformed date header - keep the local mtime
+        return
+    os.utime(output_path, (timestamp, timestamp))
+
+def save_response_body(response, output_path):
+    """Streams a response body to output_path via a .part file, so an interrupted download never leaves a truncated file."""
+    part_path = output_path + ".part"
+    try:
+        response.raw.decode_content = True  # Undo any Content-Encoding (gzip etc.) like response.content would
+        with open(part_path, "wb") as f:
+            shutil.copyfileobj(response.raw, f, length=DOWNLOAD_CHUNK_SIZE)  # Buffered copy, no per-chunk Python objects
+        set_mtime_from_last_modified(part_path, response)
+        os.replace(part_path, output_path)  # Atomic - readers see the old file or the complete new one
+        record_etag(output_path, response)
+    except BaseException:
+        try:
+            os.remove(part_path)
+        except OSError:
+            pass
+        raise
+
+def get_url_lock(url):
+    """Returns the lock serialising downloads of the same URL."""
+    with _url_locks_lock:
+        return _url_locks.setdefault(url, threading.Lock())
+
+def link_or_copy(source_path, output_path):
+    """Places an already downloaded file at output_path, as a hard link where the filesystem allows."""
+    if os.path.exists(output_path):
+        if os.path.samefile(source_path, output_path):
+            return
+        os.remove(output_path)
+    try:
+        os.link(source_path, output_path)
+    except OSError:  # Different filesystem, or no hard link support
+        shutil.copy2(source_path, output_path)
+
+def download_feed_file(feed_url, output_folder, feed_name, session=SESSION):
     """Downloads a feed file and saves it to the specified folder (general direct download)."""
     HEADERS_DIRECT_DOWNLOAD = {  # Define headers for direct downloads
         "User-Agent": "Mozilla/5.0 (compatible; MISPFeedDownloader/1.0)"
     }
     try:
-        response = requests.get(feed_url, headers=HEADERS_DIRECT_DOWNLOAD, timeout=60)  # Increased timeout to 60 seconds
-        response.raise_for_status()
-
         filename = os.path.basename(urlparse(feed_url).path)
         output_path = os.path.join(output_folder, filename)
+        headers = conditional_request_headers(HEADERS_DIRECT_DOWNLOAD, output_path)
 
-        with open(output_path, "wb") as f:
-            f.write(response.content)
+        # Stream the body straight to disk so large feeds are never held in memory
+        with session.get(feed_url, headers=headers, timeout=(CONNECT_TIMEOUT, 60), stream=True) as response:  # Increased timeout to 60 seconds
+            response.raise_for_status()
+            if response.status_code != 304:  # 304: unchanged since the copy we already have
+                save_response_body(response, output_path)
 
         return True, None
     except requests.exceptions.RequestException as e:
@@ -90,213 +232,169 @@ def download_feed_file(feed_url, output_folder, feed_name):
     except Exception as e:
         return False, str(e)
 
+def download_shared_feed_file(feed_url, output_folder, feed_name, session=SESSION):
+    """Direct feed download that fetches each URL once per run, linking later feeds with the same URL to that copy."""
+    with get_url_lock(feed_url):
+        output_path = os.path.join(output_folder, os.path.basename(urlparse(feed_url).path))
+        downloaded_path = _downloaded_files.get(feed_url)
+        if downloaded_path and os.path.isfile(downloaded_path):  # Same URL already fetched this run for another feed
+            try:
+                link_or_copy(downloaded_path, output_path)
+                return True, None
+            except OSError as e:
+                return False, str(e)
+
+        success, error = download_feed_file(feed_url, output_folder, feed_name, session)
+        if success:
+            _downloaded_files[feed_url] = output_path
+        return success, error
+
+def get_host_semaphore(url):
+    """Returns the semaphore limiting concurrent downloads from the URL's host."""
+    host = urlparse(url).netloc
+    with _host_semaphores_lock:
+        semaphore = _host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = _host_semaphores[host] = threading.BoundedSemaphore(MAX_CONNECTIONS_PER_HOST)
+        return semaphore
+
+def download_files_concurrently(file_links, download_func, feed_name, log_data):
+    """Downloads the files of a feed in parallel and logs per-file errors.
+
+    download_func takes a file_info dict and returns a (success, error) tuple.
+    """
+    def download_with_host_limit(file_info):
+        with get_host_semaphore(file_info['url']):
+            return download_func(file_info)
+
+    with ThreadPoolExecutor(max_workers=MAX_FILE_WORKERS) as executor:
+        futures = {executor.submit(download_with_host_limit, file_info): file_info for file_info in file_links}
+        for future in as_completed(futures):
+            file_info = futures[future]
+            success, error = future.result()
+            if not success:
+                log_data["error_feeds"].append(f"{feed_name} - File {file_info['filename']} ({file_info['url']}): {error}")
+
+_PLAIN_FILENAME_RE = re.compile(r"(?!\.\.?\Z)[^/?#:;\s\x00-\x1f]+\Z")  # Relative link naming a file in the same directory; anything urljoin/urlparse would rewrite (whitespace, controls, ;params) takes the slow path
+
+def resolve_listing_href(base_url, href):
+    """Resolves a directory listing link to (file_url, filename)."""
+    if base_url.endswith('/') and _PLAIN_FILENAME_RE.match(href):
+        return base_url + href, href  # Common case - no need to parse the URL
+    file_url = urljoin(base_url, href)
+    return file_url, os.path.basename(urlparse(file_url).path)
+
 def is_directory_listing_url(url):
     """Heuristic to determine if a URL is likely a directory listing."""
     parsed_url = urlparse(url)
     return parsed_url.path.endswith('/') or not parsed_url.path
 
-def fetch_directory_page_content(url, headers, timeout):
+def fetch_directory_page_content(url, headers, timeout, session=SESSION):
     """Fetches content of a directory listing page."""
     try:
-        response = requests.get(url, headers=headers, timeout=timeout)
+        response = session.get(url, headers=headers, timeout=(CONNECT_TIMEOUT, timeout))
         response.raise_for_status()
         return response.text
     except requests.RequestException as e:
         print(f"[ERROR - fetch_directory_page_content] Failed to fetch directory listing page: {url}: {e}")
         return None
 
-def download_individual_file(url, directory, filename, session):
+def download_individual_file(url, directory, filename, session=SESSION, headers=None):
     """Downloads a single file (used for directory listings).""" # Description updated - progress bar removed
     local_filename = os.path.join(directory, filename)
     try:
-        with session.get(url, stream=True, timeout=30) as r:
+        headers = conditional_request_headers(headers, local_filename)
+        with session.get(url, headers=headers, stream=True, timeout=(CONNECT_TIMEOUT, 30)) as r:
             r.raise_for_status()
-            block_size = 1024  # 1 Kibibyte
-            with open(local_filename, 'wb') as f:
-                for chunk in r.iter_content(block_size):
-                    f.write(chunk)
+            if r.status_code == 304:  # Unchanged since the copy we already have
+                return True, None
+            save_response_body(r, local_filename)
             return True, None
     except requests.RequestException as e:
         return False, str(e)
     except Exception as e:
         return False, str(e)
 
-def is_circl_feed_url(url):
-    """Checks if a URL is a CIRCL feed URL based on the base URL."""
-    circl_base_url_pattern = "/doc/misp/feed-osint"
-    return circl_base_url_pattern in urlparse(url).path
-
-def download_circl_feed(directory_url, output_folder, feed_name, log_data, days_back=DAYS_BACK_DEFAULT): # Use DAYS_BACK_DEFAULT
-    """Downloads CIRCL feed files from a directory listing with date-based filtering."""
-    try:
-        html_content = fetch_circl_page_content(directory_url)
-        if not html_content:
-            log_data["error_feeds"].append(f"{feed_name} ({directory_url}): Failed to fetch CIRCL feed page")
-            return False
-
-        date_list = get_circl_date_list(days_back)
-        file_links = parse_circl_files(html_content, directory_url, date_list)
-        if not file_links:
-            print(f"[INFO - download_circl_feed] No CIRCL files found for the past {days_back} days for {feed_name} at {directory_url}")
-            return True
-
-        for file_info in file_links:
-            success, error = download_feed_file(file_info['url'], output_folder, file_info['filename'])
-            if not success:
-                log_data["error_feeds"].append(f"{feed_name} - File {file_info['filename']} ({file_info['url']}): {error}")
-        return True
-
-    except Exception as e:
-        log_data["error_feeds"].append(f"{feed_name} ({directory_url}): Error processing CIRCL feed: {e}")
-        return False
-
-def fetch_circl_page_content(url):
-    """Fetches the HTML content of the CIRCL feed page."""
-    try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        return response.text
-    except requests.RequestException as e:
-        print(f"[ERROR - fetch_circl_page_content] Failed to fetch CIRCL page: {url}: {e}")
-        return None
-
-def get_circl_date_list(days_back):
-    """Generates a list of dates to check for CIRCL files."""
+# Known feed sources, one named group per feed type - a single search classifies a URL
+_FEED_TYPE_RE = re.compile(
+    r"(?P<circl>/doc/misp/feed-osint)"
+    r"|(?P<malwarebazaar>bazaar\.abuse\.ch/downloads/misp/)"
+    r"|(?P<threatfox>threatfox\.abuse\.ch/downloads/misp/)"
+    r"|(?P<urlhaus>urlhaus\.abuse\.ch/downloads/misp/)"
+    r"|(?P<tweetfeed>raw\.githubusercontent\.com/0xDanielLopez/TweetFeed)"
+)
+
+def get_feed_type(url):
+    """Returns the feed type of a URL (a _FEED_TYPE_RE group name), or None for other feeds."""
+    match = _FEED_TYPE_RE.search(url)
+    return match.lastgroup if match else None
+
+def get_date_list(days_back):
+    """Generates a list of dates (YYYY-MM-DD) for the past days_back days, today first."""
     today = datetime.datetime.now()
     date_list = [(today - datetime.timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days_back)]
     return date_list
 
-def parse_circl_files(html_content, base_url, date_list):
-    """Parses HTML content to extract CIRCL file links based on date."""
-    soup = BeautifulSoup(html_content, "html.parser")
-    files = []
-
-    for row in soup.find_all("tr"):
-        cols = row.find_all("td")
-        if len(cols) < 5:
-            continue
-
-        link_tag = cols[1].find("a")
-        if link_tag and link_tag.get('href'):
-            file_url = urljoin(base_url, link_tag.get('href'))
-            filename = os.path.basename(urlparse(file_url).path)
-            last_modified = cols[2].get_text(strip=True)
-
-            if any(last_modified.startswith(date) for date in date_list):
-                files.append({'url': file_url, 'filename': filename})
-
-    return files
+_LISTING_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+if lxml is not None:  # Compiled once at import, evaluated for every listing row
+    # Plain strings - lxml's default "smart" strings keep a reference to the parsed tree
+    _APACHE_ROW_HREF_XPATH = lxml.etree.XPath("(td[2]//a)[1]/@href", smart_strings=False)
+    _APACHE_ROW_DATE_XPATH = lxml.etree.XPath("normalize-space(td[3])", smart_strings=False)
+    _APACHE_HEADER_LINKS_XPATH = lxml.etree.XPath("th/a/@href", smart_strings=False)
 
-def is_malwarebazaar_feed_url(url):
-    """Checks if a URL is a Malware Bazaar feed URL based on the base URL."""
-    malwarebazaar_base_url_pattern = "/downloads/misp/"
-    return malwarebazaar_base_url_pattern in urlparse(url).path
+def parse_apache_listing(html_content, base_url, date_list):
+    """Parses an Apache-style directory listing table and returns the files modified on a date in date_list.
 
-def download_malwarebazaar_feed(directory_url, output_folder, feed_name, log_data, days_back=DAYS_BACK_DEFAULT): # Use DAYS_BACK_DEFAULT
-    """Downloads Malware Bazaar feed files for the past days_back days."""
-    try:
-        html_content = fetch_malwarebazaar_page_content(directory_url)
-        if not html_content:
-            log_data["error_feeds"].append(f"{feed_name} ({directory_url}): Failed to fetch Malware Bazaar feed page")
-            return False
-
-        date_list = get_malwarebazaar_date_list(days_back)
-        file_links = parse_malwarebazaar_files(html_content, directory_url, date_list)
-        if not file_links:
-            print(f"[INFO - download_malwarebazaar_feed] No Malware Bazaar files found for the past {days_back} days for {feed_name} at {directory_url}")
-            return True
-
-        for file_info in file_links:
-            success, error = download_feed_file(file_info['url'], output_folder, file_info['filename'])
-            if not success:
-                log_data["error_feeds"].append(f"{feed_name} - File {file_info['filename']} ({file_info['url']}): {error}")
-        return True
-
-    except Exception as e:
-        log_data["error_feeds"].append(f"{feed_name} ({directory_url}): Error processing Malware Bazaar feed: {e}")
-        return False
-
-def fetch_malwarebazaar_page_content(url):
-    """Fetches the HTML content of the Malware Bazaar feed page."""
-    try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        return response.text
-    except requests.RequestException as e:
-        print(f"[ERROR - fetch_malwarebazaar_page_content] Failed to fetch Malware Bazaar page: {url}: {e}")
-        return None
-
-def get_malwarebazaar_date_list(days_back):
-    """Generates a list of dates to check for Malware Bazaar files (reusing CIRCL's date list logic)."""
-    return get_circl_date_list(days_back)
-
-def parse_malwarebazaar_files(html_content, base_url, date_list):
-    """Parses HTML content to extract Malware Bazaar file links based on date."""
-    soup = BeautifulSoup(html_content, "html.parser")
+    CIRCL, Malware Bazaar, Threatfox and URLhaus all serve this layout: the file link is in the
+    2nd column and the Last-Modified date in the 3rd. Rows are parsed one at a time, and when the
+    listing is sorted newest first, parsing stops at the first file row older than date_list.
+    """
+    if lxml is None:  # Slow path when lxml is not installed (always scans every row)
+        return _parse_apache_listing_bs4(html_content, base_url, date_list)
+
+    if isinstance(html_content, str):
+        html_content = html_content.encode("utf-8")
+    rows = lxml.etree.iterparse(io.BytesIO(html_content), events=("end",), tag="tr", html=True, encoding="utf-8")
+    newest_first = False
+    oldest_date = min(date_list)
+    date_set = frozenset(date_list)
     files = []
-
-    for row in soup.find_all("tr"):
-        cols = row.find_all("td")
-        if len(cols) < 5:
-            continue
-
-        link_tag = cols[1].find("a")
-        if link_tag and link_tag.get('href'):
-            file_url = urljoin(base_url, link_tag.get('href'))
-            filename = os.path.basename(urlparse(file_url).path)
-            last_modified = cols[2].get_text(strip=True)
-
-            if any(last_modified.startswith(date) for date in date_list):
-                files.append({'url': file_url, 'filename': filename})
+    for _, row in rows:
+        if row.find("th") is not None:  # Column header row (or a separator row)
+            newest_first = newest_first or is_apache_listing_sorted_newest_first(row)
+        elif len(row.findall("td")) >= 5:  # Entry row (file or subdirectory)
+            hrefs = _APACHE_ROW_HREF_XPATH(row)
+            last_modified = _APACHE_ROW_DATE_XPATH(row)
+            if hrefs and hrefs[0]:
+                if last_modified[:10] in date_set:  # Dates are fixed-width YYYY-MM-DD
+                    file_url, filename = resolve_listing_href(base_url, hrefs[0])
+                    files.append({'url': file_url, 'filename': filename})
+                elif (newest_first and not hrefs[0].endswith('/')
+                        and _LISTING_DATE_RE.match(last_modified) and last_modified[:10] < oldest_date):
+                    break  # Every remaining row is older still (subdirectories may be listed first, so only a file row decides)
+
+        # Drop parsed rows so memory stays flat on long listings
+        row.clear()
+        while row.getprevious() is not None:
+            del row.getparent()[0]
 
     return files
 
-def is_threatfox_feed_url(url):
-    """Checks if a URL is a Threatfox feed URL based on the base URL."""
-    threatfox_base_url_pattern = "/downloads/misp/"
-    return threatfox_base_url_pattern in urlparse(url).path
-
-def download_threatfox_feed(directory_url, output_folder, feed_name, log_data, days_back=DAYS_BACK_DEFAULT): # Use DAYS_BACK_DEFAULT
-    """Downloads Threatfox feed files for the past days_back days."""
-    try:
-        html_content = fetch_threatfox_page_content(directory_url)
-        if not html_content:
-            log_data["error_feeds"].append(f"{feed_name} ({directory_url}): Failed to fetch Threatfox feed page")
-            return False
+def is_apache_listing_sorted_newest_first(header_row):
+    """Checks whether an Apache listing was served sorted by Last-Modified, newest first.
 
-        date_list = get_threatfox_date_list(days_back)
-        file_links = parse_threatfox_files(html_content, directory_url, date_list)
-        if not file_links:
-            print(f"[INFO - download_threatfox_feed] No Threatfox files found for the past {days_back} days for {feed_name} at {directory_url}")
-            return True
-
-        for file_info in file_links:
-            success, error = download_feed_file(file_info['url'], output_folder, file_info['filename'])
-            if not success:
-                log_data["error_feeds"].append(f"{feed_name} - File {file_info['filename']} ({file_info['url']}): {error}")
-        return True
-
-    except Exception as e:
-        log_data["error_feeds"].append(f"{feed_name} ({directory_url}): Error processing Threatfox feed: {e}")
-        return False
-
-def fetch_threatfox_page_content(url):
-    """Fetches the HTML content of the Threatfox feed page."""
-    try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        return response.text
-    except requests.RequestException as e:
-        print(f"[ERROR - fetch_threatfox_page_content] Failed to fetch Threatfox page: {url}: {e}")
-        return None
-
-def get_threatfox_date_list(days_back):
-    """Generates a list of dates to check for Threatfox files (reusing existing date list logic)."""
-    return get_circl_date_list(days_back)
-
-def parse_threatfox_files(html_content, base_url, date_list):
-    """Parses HTML content to extract Threatfox file links based on date."""
-    soup = BeautifulSoup(html_content, "html.parser")
+    Apache's column header links toggle the order of the active sort column, so after
+    APACHE_SORT_NEWEST_FIRST every header links to ascending order. The default name sort
+    links its Name column to "O=D" instead, and other servers have no such links at all.
+    """
+    header_links = _APACHE_HEADER_LINKS_XPATH(header_row)
+    return (any("C=M" in href for href in header_links)
+            and all("O=A" in href for href in header_links))
+
+def _parse_apache_listing_bs4(html_content, base_url, date_list):
+    """BeautifulSoup fallback for parse_apache_listing."""
+    soup = BeautifulSoup(html_content, HTML_PARSER)
+    date_set = frozenset(date_list)
     files = []
 
     for row in soup.find_all("tr"):
@@ -306,92 +404,61 @@ def parse_threatfox_files(html_content, base_url, date_list):
 
         link_tag = cols[1].find("a")
         if link_tag and link_tag.get('href'):
-            file_url = urljoin(base_url, link_tag.get('href'))
-            filename = os.path.basename(urlparse(file_url).path)
+            file_url, filename = resolve_listing_href(base_url, link_tag.get('href'))
             last_modified = cols[2].get_text(strip=True)
 
-            if any(last_modified.startswith(date) for date in date_list):
+            if last_modified[:10] in date_set:  # Dates are fixed-width YYYY-MM-DD
                 files.append({'url': file_url, 'filename': filename})
 
     return files
 
-def is_urlhaus_feed_url(url):
-    """Checks if a URL is a URLhaus feed URL based on the base URL."""
-    urlhaus_base_url_pattern = "/downloads/misp/"
-    return urlhaus_base_url_pattern in urlparse(url).path
-
-def download_urlhaus_feed(directory_url, output_folder, feed_name, log_data, days_back=DAYS_BACK_DEFAULT): # Use DAYS_BACK_DEFAULT
-    """Downloads URLhaus feed files for the past days_back days."""
-    HEADERS_URLHAUS = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
-
+# Feeds served as dated Apache directory listings, keyed by feed type
+FeedSpec = namedtuple("FeedSpec", ["label", "headers"])
+HEADERS_ABUSE_CH = {  # Browser User-Agent for the abuse.ch listings
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+APACHE_LISTING_FEEDS = {
+    "urlhaus": FeedSpec("URLhaus", HEADERS_ABUSE_CH),
+    "threatfox": FeedSpec("Threatfox", HEADERS_ABUSE_CH),
+    "malwarebazaar": FeedSpec("Malware Bazaar", HEADERS_ABUSE_CH),
+    "circl": FeedSpec("CIRCL", None),
+}
+TIMEOUT_APACHE_LISTING = 30
+APACHE_SORT_NEWEST_FIRST = "?C=M;O=D"  # mod_autoindex query: sort by Last-Modified, descending
+
+def download_apache_listing_feed(feed_type, directory_url, output_folder, feed_name, log_data, days_back=DAYS_BACK_DEFAULT, session=SESSION):
+    """Downloads the files of a dated Apache directory listing feed (CIRCL, Malware Bazaar, Threatfox, URLhaus) for the past days_back days."""
+    spec = APACHE_LISTING_FEEDS[feed_type]
     try:
-        html_content = fetch_urlhaus_page_content(directory_url, HEADERS_URLHAUS)
+        # Ask for the newest files first so parsing can stop at the first out-of-range row
+        listing_url = urljoin(directory_url, APACHE_SORT_NEWEST_FIRST)
+        html_content = fetch_directory_page_content(listing_url, spec.headers, TIMEOUT_APACHE_LISTING, session)
         if not html_content:
-            log_data["error_feeds"].append(f"{feed_name} ({directory_url}): Failed to fetch URLhaus feed page")
+            log_data["error_feeds"].append(f"{feed_name} ({directory_url}): Failed to fetch {spec.label} feed page")
             return False
 
-        date_list = get_urlhaus_date_list(days_back)
-        file_links = parse_urlhaus_files(html_content, directory_url, date_list)
+        date_list = get_date_list(days_back)
+        file_links = parse_apache_listing(html_content, directory_url, date_list)
         if not file_links:
-            print(f"[INFO - download_urlhaus_feed] No URLhaus files found for the past {days_back} days for {feed_name} at {directory_url}")
+            print(f"[INFO - download_apache_listing_feed] No {spec.label} files found for the past {days_back} days for {feed_name} at {directory_url}")
             return True
 
-        for file_info in file_links:
-            success, error = download_feed_file(file_info['url'], output_folder, file_info['filename'])
-            if not success:
-                log_data["error_feeds"].append(f"{feed_name} - File {file_info['filename']} ({file_info['url']}): {error}")
+        download_files_concurrently(
+            file_links,
+            lambda file_info: download_feed_file(file_info['url'], output_folder, file_info['filename'], session),
+            feed_name, log_data)
         return True
 
     except Exception as e:
-        log_data["error_feeds"].append(f"{feed_name} ({directory_url}): Error processing URLhaus feed: {e}")
+        log_data["error_feeds"].append(f"{feed_name} ({directory_url}): Error processing {spec.label} feed: {e}")
         return False
 
-def fetch_urlhaus_page_content(url, headers):
-    """Fetches the HTML content of the URLhaus feed page, including User-Agent header."""
-    try:
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        return response.text
-    except requests.RequestException as e:
-        print(f"[ERROR - fetch_urlhaus_feed] Failed to fetch URLhaus page: {url}: {e}")
-        return None
-
-def get_urlhaus_date_list(days_back):
-    """Generates date list for URLhaus (reusing existing date list logic)."""
-    return get_circl_date_list(days_back)
-
-def parse_urlhaus_files(html_content, base_url, date_list):
-    """Parses HTML content to extract URLhaus file links based on date."""
-    soup = BeautifulSoup(html_content, "html.parser")
-    files = []
-
-    for row in soup.find_all("tr"):
-        cols = row.find_all("td")
-        if len(cols) < 5:
-            continue
-
-        link_tag = cols[1].find("a")
-        if link_tag and link_tag.get('href'):
-            file_url = urljoin(base_url, link_tag.get('href'))
-            filename = os.path.basename(urlparse(file_url).path)
-            last_modified = cols[2].get_text(strip=True)
-
-            if any(last_modified.startswith(date) for date in date_list):
-                files.append({'url': file_url, 'filename': filename})
-
-    return files
-
-def is_tweetfeed_url(url):
-    """Checks if a URL is a TweetFeed URL based on the base URL."""
-    tweetfeed_base_url_pattern = "raw.githubusercontent.com/0xDanielLopez/TweetFeed"
-    return tweetfeed_base_url_pattern in urlparse(url).netloc + urlparse(url).path
+_INVALID_FILENAME_CHARS_TABLE = str.maketrans({c: '_' for c in '<>:"/\\|?*'})  # Characters Windows forbids in names
 
 def sanitize_filename(filename):
     """Sanitizes a filename or directory name to be Windows-compatible."""
     # Replace invalid characters with underscores
-    sanitized_name = re.sub(r'[<>:"/\\|?*]', '_', filename)
+    sanitized_name = filename.translate(_INVALID_FILENAME_CHARS_TABLE)
     # Remove leading and trailing spaces and dots
     sanitized_name = sanitized_name.strip(' .')
     # Limit filename length (Windows MAX_PATH is 260, keep some buffer)
@@ -400,7 +467,7 @@ def sanitize_filename(filename):
 
 def parse_botvrij_listing_content(html_content, base_url):
     """Parses HTML content specifically for Botvrij to extract JSON file links."""
-    soup = BeautifulSoup(html_content, 'html.parser')
+    soup = BeautifulSoup(html_content, HTML_PARSER)
     file_links = []
     pre_tag = soup.find('pre')
     if not pre_tag:
@@ -410,7 +477,7 @@ def parse_botvrij_listing_content(html_content, base_url):
     for a_tag in pre_tag.find_all('a'):
         href = a_tag.get('href', '')
         if href.endswith('.json'):  # <--- Specific to Botvrij: Only get JSON files
-            file_url = urljoin(base_url, href)
+            file_url = resolve_listing_href(base_url, href)[0]
             filename = href # Use href directly as filename for Botvrij as per provided script
             file_links.append({
                 "filename": filename,
@@ -419,7 +486,7 @@ def parse_botvrij_listing_content(html_content, base_url):
 
     return file_links
 
-def download_botvrij_feed(directory_url, output_folder, feed_name, log_data):
+def download_botvrij_feed(directory_url, output_folder, feed_name, log_data, session=SESSION):
     """Downloads Botvrij feed files, specifically JSON files from directory listing."""
     HEADERS_BOTVRIJ = {
         "User-Agent": "Mozilla/5.0 (compatible; IntelScraperBot/1.0)" # Using User-Agent from provided Botvrij script
@@ -431,7 +498,7 @@ def download_botvrij_feed(directory_url, output_folder, feed_name, log_data):
         if not directory_url.endswith('/'):
             directory_url += '/'
 
-        html_content = fetch_directory_page_content(directory_url, HEADERS_BOTVRIJ, TIMEOUT_BOTVRIJ) # Reusing fetch_directory_page_content
+        html_content = fetch_directory_page_content(directory_url, HEADERS_BOTVRIJ, TIMEOUT_BOTVRIJ, session) # Reusing fetch_directory_page_content
         if not html_content:
             log_data["error_feeds"].append(f"{feed_name} ({directory_url}): Failed to fetch Botvrij directory listing page")
             return False
@@ -441,19 +508,17 @@ def download_botvrij_feed(directory_url, output_folder, feed_name, log_data):
             print(f"[WARNING - download_botvrij_feed] No JSON files found in Botvrij directory listing for {feed_name} at {directory_url}")
             return True
 
-        with requests.Session() as session:
-            session.headers.update(HEADERS_BOTVRIJ) # Use Botvrij specific headers
-            for file_info in file_links:
-                success, error = download_individual_file(file_info['url'], output_folder, file_info['filename'], session) # Reusing download_individual_file
-                if not success:
-                    log_data["error_feeds"].append(f"{feed_name} - File {file_info['filename']} ({file_info['url']}): {error}")
+        download_files_concurrently(
+            file_links,
+            lambda file_info: download_individual_file(file_info['url'], output_folder, file_info['filename'], session, HEADERS_BOTVRIJ), # Shared session, Botvrij specific headers
+            feed_name, log_data)
         return True
 
     except Exception as e:
         log_data["error_feeds"].append(f"{feed_name} ({directory_url}): Error processing Botvrij feed: {e}")
         return False
 
-def download_directory_listing_feed(directory_url, output_folder, feed_name, log_data):
+def download_directory_listing_feed(directory_url, output_folder, feed_name, log_data, session=SESSION):
     """Downloads all files from a generic directory listing page."""
     HEADERS_DIRECTORY_LISTING = {  # Define headers for generic directory listing
         "User-Agent": "Mozilla/5.0 (compatible; GenericDirectoryDownloader/1.0)"
@@ -465,7 +530,7 @@ def download_directory_listing_feed(directory_url, output_folder, feed_name, log
         if not directory_url.endswith('/'):
             directory_url += '/'
 
-        html_content = fetch_directory_page_content(directory_url, HEADERS_DIRECTORY_LISTING, TIMEOUT_DIRECTORY_LISTING) # Reusing fetch_directory_page_content
+        html_content = fetch_directory_page_content(directory_url, HEADERS_DIRECTORY_LISTING, TIMEOUT_DIRECTORY_LISTING, session) # Reusing fetch_directory_page_content
         if not html_content:
             log_data["error_feeds"].append(f"{feed_name} ({directory_url}): Failed to fetch directory listing page")
             return False
@@ -475,12 +540,10 @@ def download_directory_listing_feed(directory_url, output_folder, feed_name, log
             print(f"[WARNING - download_directory_listing_feed] No files found in directory listing for {feed_name} at {directory_url}")
             return True # Not an error, just no files found
 
-        with requests.Session() as session:
-            session.headers.update(HEADERS_DIRECTORY_LISTING) # Use generic headers
-            for file_info in file_links:
-                success, error = download_individual_file(file_info['url'], output_folder, file_info['filename'], session) # Reusing download_individual_file with progress
-                if not success:
-                    log_data["error_feeds"].append(f"{feed_name} - File {file_info['filename']} ({file_info['url']}): {error}")
+        download_files_concurrently(
+            file_links,
+            lambda file_info: download_individual_file(file_info['url'], output_folder, file_info['filename'], session, HEADERS_DIRECTORY_LISTING), # Shared session, generic headers
+            feed_name, log_data)
         return True
 
     except Exception as e:
@@ -489,7 +552,7 @@ def download_directory_listing_feed(directory_url, output_folder, feed_name, log
 
 def parse_directory_listing_content(html_content, base_url):
     """Parses HTML content from a directory listing to extract file links (generic)."""
-    soup = BeautifulSoup(html_content, 'html.parser')
+    soup = BeautifulSoup(html_content, HTML_PARSER)
     file_links = []
     # Look for links in <pre> tags (common in simple directory listings)
     pre_tag = soup.find('pre')
@@ -497,8 +560,7 @@ def parse_directory_listing_content(html_content, base_url):
         for a_tag in pre_tag.find_all('a'):
             href = a_tag.get('href')
             if href and not href.startswith('?') and not href.startswith('..'): # Exclude CGI params and parent dir links
-                file_url = urljoin(base_url, href)
-                filename = os.path.basename(urlparse(file_url).path)
+                file_url, filename = resolve_listing_href(base_url, href)
                 file_links.append({
                     "filename": filename,
                     "url": file_url
@@ -510,8 +572,7 @@ def parse_directory_listing_content(html_content, base_url):
     for a_tag in soup.find_all('a'):
         href = a_tag.get('href')
         if href and not href.startswith('?') and not href.startswith('..'):
-            file_url = urljoin(base_url, href)
-            filename = os.path.basename(urlparse(file_url).path)
+            file_url, filename = resolve_listing_href(base_url, href)
             file_links.append({
                 "filename": filename,
                 "url": file_url
@@ -519,55 +580,86 @@ def parse_directory_listing_content(html_content, base_url):
     return file_links
 
 
+@functools.lru_cache(maxsize=None)
+def ensure_dir(path):
+    """Creates a directory (and parents) once per run; repeat calls are a cache hit with no syscall."""
+    os.makedirs(path, exist_ok=True)
+
+# Download order of the feed categories, and the category of each classified feed type
+FEED_CATEGORY_ORDER = [
+    "CIRCL Feeds",
+    "Botvrij Feeds",
+    "Malware Bazaar Feeds",
+    "ThreatFox Feeds",
+    "URLHaus Feeds",
+    "TweetFeed Feeds",
+    "MISP Site Feeds (Others)",
+]
+FEED_TYPE_CATEGORIES = {
+    "circl": "CIRCL Feeds",
+    "malwarebazaar": "Malware Bazaar Feeds",
+    "threatfox": "ThreatFox Feeds",
+    "urlhaus": "URLHaus Feeds",
+    "tweetfeed": "TweetFeed Feeds",
+}
+
+def record_successful_feed():
+    """Increments the successful feed counter (safe to call from worker threads)."""
+    global successful_feed_count
+    with _successful_feed_count_lock:
+        successful_feed_count += 1
+
 def process_single_feed(url, name, output_dir, log_data, days_back=DAYS_BACK_DEFAULT): # Accept days_back as argument
     """Processes a single feed and downloads it. Handles different feed types."""
-    global successful_feed_count  # Use the global counter
+    # Collect this feed's errors locally and hand them to the shared log in one extend,
+    # which also keeps them together in the log instead of interleaved with other feeds
+    feed_log_data = {"error_feeds": []}
+    try:
+        _process_single_feed(url, name, output_dir, feed_log_data, days_back)
+    finally:
+        log_data["error_feeds"].extend(feed_log_data["error_feeds"])
 
+def _process_single_feed(url, name, output_dir, log_data, days_back):
+    """Body of process_single_feed, logging into the feed's own log_data."""
     try:
         # Sanitize the feed name for directory creation
         sanitized_feed_name = sanitize_filename(name)
         feed_folder = os.path.join(output_dir, sanitized_feed_name)
-        os.makedirs(feed_folder, exist_ok=True)
+        ensure_dir(feed_folder)
+
+        feed_type = get_feed_type(url)  # Classified once, dispatched below
 
         if "botvrij" in name.lower(): # Check for Botvrij FIRST -  important to use dedicated function
             print(f"[INFO] Processing Botvrij feed: {name} from {url}")
             success = download_botvrij_feed(url, feed_folder, name, log_data) # Use dedicated Botvrij function
-        elif is_tweetfeed_url(url):  # Check for TweetFeed URLs
+        elif feed_type == "tweetfeed":  # Check for TweetFeed URLs
             print(f"[INFO] Processing TweetFeed: {name} from {url} (direct download)")
-            success, error = download_feed_file(url, feed_folder, name)  # Treat as direct download - reuse download_feed_file
+            success, error = download_shared_feed_file(url, feed_folder, name)  # Treat as direct download - the TweetFeed entries share one URL
             if not success:
                 log_data["error_feeds"].append(f"{name} ({url}): {error}")
                 return
-        elif is_urlhaus_feed_url(url):  # Then check for URLhaus URLs
-            print(f"[INFO] Processing URLhaus feed: {name} from {url}")
-            success = download_urlhaus_feed(url, feed_folder, name, log_data, days_back=days_back) # Pass days_back
-        elif is_threatfox_feed_url(url):  # Then check for Threatfox URLs
-            print(f"[INFO] Processing Threatfox feed: {name} from {url}")
-            success = download_threatfox_feed(url, feed_folder, name, log_data, days_back=days_back) # Pass days_back
-        elif is_malwarebazaar_feed_url(url):  # Then check for Malware Bazaar URLs
-            print(f"[INFO] Processing Malware Bazaar feed: {name} from {url}")
-            success = download_malwarebazaar_feed(url, feed_folder, name, log_data, days_back=days_back) # Pass days_back
-        elif is_circl_feed_url(url):  # Then check for CIRCL URLs
-            print(f"[INFO] Processing CIRCL feed: {name} from {url}")
-            success = download_circl_feed(url, feed_folder, name, log_data, days_back=days_back) # Pass days_back
+        elif feed_type in APACHE_LISTING_FEEDS:  # Then URLhaus, Threatfox, Malware Bazaar and CIRCL listings
+            print(f"[INFO] Processing {APACHE_LISTING_FEEDS[feed_type].label} feed: {name} from {url}")
+            success = download_apache_listing_feed(feed_type, url, feed_folder, name, log_data, days_back=days_back) # Pass days_back
         elif is_directory_listing_url(url):  # Then check for generic directory listings (AFTER Botvrij)
             print(f"[INFO] Processing directory listing feed: {name} from {url}")
             success = download_directory_listing_feed(url, feed_folder, name, log_data) # Use generic directory listing for others, EXCEPT Botvrij
         else:  # Otherwise, assume it's a direct download (for other types)
             print(f"[INFO] Processing direct download feed: {name} from {url}")
-            success, error = download_feed_file(url, feed_folder, name)  # Use general download function
+            success, error = download_shared_feed_file(url, feed_folder, name)  # Use general download function
             if not success:
                 log_data["error_feeds"].append(f"{name} ({url}): {error}")
                 return
 
         if success:
-            global successful_feed_count  # Access the global counter
-            successful_feed_count += 1  # Increment successful download count
+            record_successful_feed()  # Increment successful download count
         # else: # No need for else here, errors are handled in download_*_feed functions
 
     except Exception as e:
         log_data["error_feeds"].append(f"{name}: {e}")
 
+_FEED_LIST_LINK_RE = re.compile(r'<li>\s*<a\s+href="([^"]+)"[^>]*>(.*?)</a>', re.IGNORECASE | re.DOTALL)
+
 def fetch_feed_list():
     """Fetches the list of feeds from the MISP website (using provided HTML) and includes TweetFeed URLs."""
     # --- Using provided HTML content directly WITH TWEETFEED URLs ---
@@ -581,18 +673,14 @@ def fetch_feed_list():
         <li><a href="https://raw.githubusercontent.com/0xDanielLopez/TweetFeed/master/week.csv">TweetFeed Week MD5</a> - TweetFeed - feed format: csv (MD5)</li>
     </ul>
     """
-    soup = BeautifulSoup(html_content, "html.parser")
-
     feed_data = []
 
-    for li in soup.find_all("li"):
-        link = li.find("a")
-        if link and "href" in link.attrs:
-            url = link["href"].strip()
-            if not url.startswith("http"):
-                url = urljoin(BASE_URL, url)  # This line might be unnecessary now for test HTML
-            name = link.text.strip()
-            feed_data.append((url, name.replace("/", "-")))
+    for match in _FEED_LIST_LINK_RE.finditer(html_content):  # First link of every <li>
+        url = html.unescape(match.group(1)).strip()
+        if not url.startswith("http"):
+            url = urljoin(BASE_URL, url)  # This line might be unnecessary now for test HTML
+        name = html.unescape(match.group(2)).strip()
+        feed_data.append((url, name.replace("/", "-")))
 
     if not feed_data:
         print("Warning: No feeds found in the provided HTML.")
@@ -607,38 +695,37 @@ def fetch_feed_list():
     
     return feed_data
 
-def create_log_file(log_file):
-    """Creates the log file with headers."""
+def write_log_file(log_file, log_data):
+    """Writes the log file (headers and this run's entry) in one go at the end of the run."""
     with open(log_file, "w", newline="", encoding="utf-8") as csvfile:
         writer = csv.writer(csvfile)
-        writer.writerow(["Date", "Start Time", "Completion Time", "Total Run Time (seconds)", "Error Feeds"])
-
-def write_log_entry(log_file, log_data):
-    """Writes a log entry to the CSV file."""
-    with open(log_file, "a", newline="", encoding="utf-8") as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow([
-            log_data["date"],
-            log_data["start_time"],
-            log_data["completion_time"],
-            log_data["total_time"],
-            "; ".join(log_data["error_feeds"]),
+        writer.writerows([
+            ["Date", "Start Time", "Completion Time", "Total Run Time (seconds)", "Error Feeds"],
+            [
+                log_data["date"],
+                log_data["start_time"],
+                log_data["completion_time"],
+                log_data["total_time"],
+                "; ".join(log_data["error_feeds"]),
+            ],
         ])
 
 def main():
     """Main function to run the script."""
     global successful_feed_count  # Access the global counter
     successful_feed_count = 0  # Reset counter at the start of each run
+    _downloaded_files.clear()  # Direct-download dedup state is per run
+    _url_locks.clear()
 
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    create_log_file(LOG_FILE)
+    ensure_dir(OUTPUT_DIR)
+    load_etags(ETAGS_FILE)
 
     log_data = {
-        "date": datetime.date.today().strftime("%Y-%m-%d"),
-        "start_time": datetime.datetime.now().strftime("%H:%M:%S"),
+        "date": time.strftime("%Y-%m-%d"),
+        "start_time": time.strftime("%H:%M:%S"),
         "completion_time": "",
         "total_time": 0,
-        "error_feeds": [],
+        "error_feeds": deque(),  # Extended concurrently by feed workers (see process_single_feed)
     }
 
     ascii_art()
@@ -664,33 +751,33 @@ def main():
         print("No feeds found. Exiting.")
         return
 
-    # Feed Categorization for Download Order
-    feed_categories_ordered = [
-        ("CIRCL Feeds", [(url, name) for url, name in feed_data if is_circl_feed_url(url)]),
-        ("Botvrij Feeds", [(url, name) for url, name in feed_data if "botvrij" in name.lower()]),
-        ("Malware Bazaar Feeds", [(url, name) for url, name in feed_data if is_malwarebazaar_feed_url(url)]),
-        ("ThreatFox Feeds", [(url, name) for url, name in feed_data if is_threatfox_feed_url(url)]),
-        ("URLHaus Feeds", [(url, name) for url, name in feed_data if is_urlhaus_feed_url(url)]),
-        ("TweetFeed Feeds", [(url, name) for url, name in feed_data if is_tweetfeed_url(url)]),
-        ("MISP Site Feeds (Others)", [(url, name) for url, name in feed_data if not any([is_circl_feed_url(url), "botvrij" in name.lower(), is_malwarebazaar_feed_url(url), is_threatfox_feed_url(url), is_urlhaus_feed_url(url), is_tweetfeed_url(url)])]),
-    ]
-
-    for category_name, feeds in feed_categories_ordered:
-        if feeds: # Only process if there are feeds in this category
-            print(f"\n--- Processing Category: {category_name} ---")
-            print(f"Downloading feeds for category: {category_name}") # Informative message - category start
-            total_tasks = len(feeds)
-            with ThreadPoolExecutor() as executor:
-                futures = [executor.submit(process_single_feed, url, name, OUTPUT_DIR, log_data, days_back) for url, name in feeds]
-                for future in futures: # Removed tqdm progress bar - direct iteration
-                    future.result() # Still need to get result to ensure tasks complete
+    # Feed Categorization for Download Order - one pass, each feed lands in exactly one category
+    feed_categories_ordered = {category_name: [] for category_name in FEED_CATEGORY_ORDER}
+    for url, name in feed_data:
+        if "botvrij" in name.lower():  # Same precedence as process_single_feed
+            category_name = "Botvrij Feeds"
         else:
-            print(f"\n--- No feeds in Category: {category_name} ---")
+            category_name = FEED_TYPE_CATEGORIES.get(get_feed_type(url), "MISP Site Feeds (Others)")
+        feed_categories_ordered[category_name].append((url, name))
+
+    # Feeds are submitted in category order but run concurrently, so slow feeds overlap with fast ones
+    with ThreadPoolExecutor(max_workers=min(MAX_FEED_WORKERS, len(feed_data))) as executor:
+        futures = []
+        for category_name, feeds in feed_categories_ordered.items():
+            if feeds: # Only submit if there are feeds in this category
+                print(f"Queued {len(feeds)} feeds for category: {category_name}")
+                futures.extend(executor.submit(process_single_feed, url, name, OUTPUT_DIR, log_data, days_back) for url, name in feeds)
+            else:
+                print(f"No feeds in category: {category_name}")
+        print()  # Separate the queue summary from the interleaved feed output
+        for future in as_completed(futures):
+            future.result() # Still need to get result to ensure tasks complete
 
     end_time = time.time()
-    log_data["completion_time"] = datetime.datetime.now().strftime("%H:%M:%S")
+    log_data["completion_time"] = time.strftime("%H:%M:%S")
     log_data["total_time"] = round(end_time - start_time, 2)
-    write_log_entry(LOG_FILE, log_data)
+    write_log_file(LOG_FILE, log_data)
+    save_etags(ETAGS_FILE)
 
     # Completion message
     print(f"\n--- Script Completed ---")